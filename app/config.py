@@ -32,12 +32,29 @@ class Settings(BaseSettings):
     similarity_top_k: int = 3
     similarity_score_threshold: Optional[float] = None  # Remove threshold for now
     score_normalization: bool = True
+    filter_max_document_ids: int = 500
+    
+    # Context packing settings
+    context_packing: bool = True
+    context_token_budget: int = 2000
     
     # Ingestion settings
     allowed_extensions: List[str] = ["pdf", "txt"]
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     temp_file_path: str = "/app/data/temp"
     
+    # Snapshot settings
+    snapshot_batch_size: int = 5000
+    
+    # Admission control settings
+    interactive_max_concurrency: int = 8
+    interactive_max_queue: int = 32
+    interactive_queue_timeout: float = 10.0
+    ingest_max_concurrency: int = 2
+    ingest_max_queue: int = 8
+    ingest_queue_timeout: float = 60.0
+    admission_retry_after: int = 5
+    
     # Generation settings
     max_tokens: int = 512
     temperature: float = 0.7
@@ -1,7 +1,11 @@
 # app/dependencies.py
-from logging import Logger
-from app.services.indexing import IndexingService
+import logging
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator
+from app.services.indexing import IndexingService, DocumentMetadata
 from app.services.retrieval import RetrievalService
+from app.services.generations import bump_generation, get_generations, vector_store_cache
+from app.services.metadata_index import record_document
 from app.config import settings
 from fastapi import Depends, HTTPException, status
 from langchain_chroma import Chroma
@@ -9,7 +13,9 @@ from langchain_together.embeddings import TogetherEmbeddings
 from app.utils.ollama_embed import OllamaEmbedding
 import chromadb
 from sqlalchemy.orm import Session
-from app.models.database import SessionLocal
+from app.models.database import SessionLocal, Agent as DBAgent
+
+logger = logging.getLogger(__name__)
 
 def get_embedding_function():
     """Create and return an embedding function instance."""
@@ -19,36 +25,106 @@ def get_embedding_function():
     )
     
 
-def get_vector_store(agent_id: str):
-    """Create and return a Chroma vector store instance for a specific agent."""
-    try:
-        agent = agents.get(agent_id)
-        if not agent:
-            raise ValueError("Agent not found")
-        
-        embedding_function = get_embedding_function()
-        client = chromadb.PersistentClient(path=agent.knowledge_base_path)
-        return Chroma(
-            client=client,
-            collection_name=settings.chroma_collection_name,
-            embedding_function=embedding_function
-        )
-    except Exception as e:
-        Logger.error(f"Failed to initialize vector store for agent {agent_id}: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to initialize vector store"
-        )
-
-def get_indexing_service(vector_store: Chroma = Depends(get_vector_store)):
-    return IndexingService(vector_store)
-
-def get_retrieval_service(vector_store: Chroma = Depends(get_vector_store)):
-    return RetrievalService(vector_store)
-
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_agent(agent_id: str, db: Session = Depends(get_db)) -> DBAgent:
+    """Look up the agent that owns the requested knowledge base."""
+    agent = db.query(DBAgent).filter(DBAgent.id == agent_id).first()
+    if not agent:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    return agent
+
+def _open_vector_store(knowledge_base_path: str, embedding_function) -> Chroma:
+    """Open the Chroma collection stored at the given knowledge base path."""
+    client = chromadb.PersistentClient(path=knowledge_base_path)
+    return Chroma(
+        client=client,
+        collection_name=settings.chroma_collection_name,
+        embedding_function=embedding_function
+    )
+
+def get_knowledge_base_generations(
+    agent: DBAgent = Depends(get_agent),
+    db: Session = Depends(get_db),
+) -> Dict[str, int]:
+    """Read the shared generation of every knowledge base the agent uses."""
+    return get_generations(db, [agent.knowledge_base_path, *agent.get_shared_knowledge_base_paths()])
+
+@contextmanager
+def lease_vector_store(knowledge_base_path: str, generation: int) -> Iterator[Chroma]:
+    """Reuse this worker's handle unless another worker has written since it was opened."""
+    store = vector_store_cache.acquire(
+        knowledge_base_path,
+        generation,
+        lambda: _open_vector_store(knowledge_base_path, get_embedding_function())
+    )
+    try:
+        yield store
+    finally:
+        vector_store_cache.release(store)
+
+def get_vector_store(
+    agent: DBAgent = Depends(get_agent),
+    generations: Dict[str, int] = Depends(get_knowledge_base_generations),
+):
+    """Lease a Chroma vector store instance for a specific agent for the request."""
+    with ExitStack() as stack:
+        try:
+            path = agent.knowledge_base_path
+            store = stack.enter_context(lease_vector_store(path, generations[path]))
+        except Exception as e:
+            logger.error(f"Failed to initialize vector store for agent {agent.id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to initialize vector store"
+            )
+        yield store
+
+def get_shared_vector_stores(
+    agent: DBAgent = Depends(get_agent),
+    generations: Dict[str, int] = Depends(get_knowledge_base_generations),
+):
+    """Lease the shared knowledge bases an agent searches alongside its own store."""
+    with ExitStack() as stack:
+        try:
+            stores: Dict[str, Chroma] = {
+                path: stack.enter_context(lease_vector_store(path, generations[path]))
+                for path in agent.get_shared_knowledge_base_paths()
+                if path != agent.knowledge_base_path
+            }
+        except Exception as e:
+            logger.error(f"Failed to initialize shared vector stores for agent {agent.id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to initialize shared vector stores"
+            )
+        yield stores
+
+def get_indexing_service(
+    agent: DBAgent = Depends(get_agent),
+    vector_store: Chroma = Depends(get_vector_store),
+    db: Session = Depends(get_db),
+):
+    def on_indexed(doc_metadata: DocumentMetadata, chunk_count: int):
+        record_document(
+            db,
+            agent.knowledge_base_path,
+            doc_metadata.document_hash,
+            {"ingested_at": doc_metadata.ingested_at, **doc_metadata.additional_metadata},
+            chunk_count
+        )
+        generation = bump_generation(db, agent.knowledge_base_path)
+        vector_store_cache.mark_current(agent.knowledge_base_path, generation, vector_store)
+
+    return IndexingService(vector_store, on_indexed=on_indexed)
+
+def get_retrieval_service(
+    vector_store: Chroma = Depends(get_vector_store),
+    shared_stores: Dict[str, Chroma] = Depends(get_shared_vector_stores),
+):
+    return RetrievalService(vector_store, shared_stores=shared_stores)
@@ -1,7 +1,9 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.routes import rag, agents
 from app.config import settings
+from app.services.scheduler import scheduler, classify_request, AdmissionRejected
 from fastapi.middleware.cors import CORSMiddleware
 app = FastAPI(title="RAG Assistant API")
 
@@ -14,10 +16,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admission control runs before the route reads the request body,
+# so shed uploads are rejected without being received in full
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    priority_class = classify_request(request.method, request.url.path)
+    if priority_class is None:
+        return await call_next(request)
+    try:
+        async with scheduler.admit(priority_class):
+            return await call_next(request)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
 # Include routers
 app.include_router(rag.router, prefix="/api/v1")
 app.include_router(agents.router, prefix="/api/v1")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/health/admission")
+async def admission_stats():
+    """Report queue depth, concurrency and wait times per traffic class."""
+    return scheduler.stats()
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, create_engine
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import json
+from typing import List
 
 Base = declarative_base()
 
@@ -10,8 +11,12 @@ class Agent(Base):
     
     id = Column(String, primary_key=True)
     knowledge_base_path = Column(String, nullable=False)
+    shared_knowledge_base_paths = Column(String, default="[]")  # Store paths as a JSON string
     chats = relationship("Chat", back_populates="agent")
 
+    def get_shared_knowledge_base_paths(self) -> List[str]:
+        return json.loads(self.shared_knowledge_base_paths or "[]")
+
 class Chat(Base):
     __tablename__ = 'chats'
     
@@ -25,9 +30,39 @@ class Chat(Base):
         messages.append(message)
         self.messages = json.dumps(messages)
 
+class KnowledgeBaseGeneration(Base):
+    __tablename__ = 'knowledge_base_generations'
+
+    knowledge_base_path = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)  # Bumped on every write to the knowledge base
+
+class KnowledgeBaseIngest(Base):
+    __tablename__ = 'knowledge_base_ingests'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    knowledge_base_path = Column(String, nullable=False, index=True)
+    document_hash = Column(String, nullable=False, index=True)
+    source_type = Column(String, index=True)
+    filename = Column(String)
+    url = Column(String)
+    title = Column(String)
+    ingested_at = Column(Float, index=True)  # Unix timestamp, matches the chunk metadata
+    chunk_count = Column(Integer, nullable=False, default=0)
+
 # Create an engine and session
 engine = create_engine('sqlite:///app.db')
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create tables
-Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
+
+def _add_missing_columns() -> None:
+    """Add columns introduced after a table was first created; create_all never alters tables."""
+    columns = {column["name"] for column in inspect(engine).get_columns("agents")}
+    if "shared_knowledge_base_paths" not in columns:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE agents ADD COLUMN shared_knowledge_base_paths VARCHAR DEFAULT '[]'"
+            ))
+
+_add_missing_columns()
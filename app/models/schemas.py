@@ -1,13 +1,25 @@
 # app/models/schemas.py
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+class QuestionFilters(BaseModel):
+    source_types: Optional[List[str]] = None
+    document_hashes: Optional[List[str]] = None
+    filenames: Optional[List[str]] = None
+    urls: Optional[List[str]] = None
+    titles: Optional[List[str]] = None
+    ingested_after: Optional[datetime] = None
+    ingested_before: Optional[datetime] = None
 
 class QuestionRequest(BaseModel):
     question: str
+    filters: Optional[QuestionFilters] = None
 
 class AnswerResponse(BaseModel):
     answer: str
     sources: List[str]
+    metadata: Dict[str, Any] = {}
 
 class IngestResponse(BaseModel):
     success: bool
@@ -16,6 +28,12 @@ class IngestResponse(BaseModel):
 class Agent(BaseModel):
     id: str
     knowledge_base_path: str
+    shared_knowledge_base_paths: List[str] = []
+
+class SnapshotImportResponse(BaseModel):
+    agent: Agent
+    count: int
+    dimension: int
 
 class Chat(BaseModel):
     id: str
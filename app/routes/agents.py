@@ -1,10 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 from app.models.database import Agent as DBAgent, Chat as DBChat
-from app.models.schemas import Agent, Chat
-from app.dependencies import get_db
+from app.models.schemas import Agent, Chat, SnapshotImportResponse
+from app.dependencies import get_db, lease_vector_store
+from app.services.generations import bump_generation, get_generations, vector_store_cache
+from app.services.metadata_index import record_document
+from app.services.snapshot import SnapshotService
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _to_agent_schema(db_agent: DBAgent) -> Agent:
+    return Agent(
+        id=db_agent.id,
+        knowledge_base_path=db_agent.knowledge_base_path,
+        shared_knowledge_base_paths=db_agent.get_shared_knowledge_base_paths()
+    )
 
 @router.post("/agents", response_model=Agent)
 async def create_agent(agent: Agent, db: Session = Depends(get_db)):
@@ -12,18 +30,24 @@ async def create_agent(agent: Agent, db: Session = Depends(get_db)):
     Create a new agent.
 
     This endpoint allows you to create a new agent with a specified knowledge base path.
+    Additional shared knowledge bases can be listed so the agent searches them alongside
+    its own store.
 
     Args:
-        agent: The agent data including ID and knowledge base path.
+        agent: The agent data including ID, knowledge base path and shared knowledge base paths.
 
     Returns:
         The created agent object.
     """
-    db_agent = DBAgent(id=agent.id, knowledge_base_path=agent.knowledge_base_path)
+    db_agent = DBAgent(
+        id=agent.id,
+        knowledge_base_path=agent.knowledge_base_path,
+        shared_knowledge_base_paths=json.dumps(agent.shared_knowledge_base_paths)
+    )
     db.add(db_agent)
     db.commit()
     db.refresh(db_agent)
-    return db_agent
+    return _to_agent_schema(db_agent)
 
 @router.get("/agents/{agent_id}", response_model=Agent)
 async def get_agent(agent_id: str, db: Session = Depends(get_db)):
@@ -41,7 +65,7 @@ async def get_agent(agent_id: str, db: Session = Depends(get_db)):
     db_agent = db.query(DBAgent).filter(DBAgent.id == agent_id).first()
     if not db_agent:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return db_agent
+    return _to_agent_schema(db_agent)
 
 @router.post("/agents/{agent_id}/chats", response_model=Chat)
 async def create_chat(agent_id: str, chat: Chat, db: Session = Depends(get_db)):
@@ -80,4 +104,96 @@ async def get_chat(agent_id: str, chat_id: str, db: Session = Depends(get_db)):
     db_chat = db.query(DBChat).filter(DBChat.id == chat_id, DBChat.agent_id == agent_id).first()
     if not db_chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    return db_chat 
\ No newline at end of file
+    return db_chat
+
+@router.get("/agents/{agent_id}/snapshot", response_class=FileResponse)
+async def export_snapshot(agent_id: str, db: Session = Depends(get_db)):
+    """
+    Export an agent's knowledge base as a snapshot file.
+
+    This endpoint dumps the ids, texts, metadata and embeddings of the agent's collection
+    into a compressed columnar .npz file that can be imported into another agent.
+
+    Args:
+        agent_id: The ID of the agent whose knowledge base is exported.
+
+    Returns:
+        The snapshot file, otherwise raises a 404 error if the agent does not exist.
+    """
+    db_agent = db.query(DBAgent).filter(DBAgent.id == agent_id).first()
+    if not db_agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    path = db_agent.knowledge_base_path
+    fd, file_path = tempfile.mkstemp(suffix=".npz")
+    os.close(fd)
+    try:
+        # Read through the generation-checked handle so another worker's writes are visible
+        with lease_vector_store(path, get_generations(db, [path])[path]) as store:
+            await asyncio.to_thread(SnapshotService().export_snapshot, store._collection, file_path)
+    except Exception as e:
+        os.remove(file_path)
+        logger.error(f"Snapshot export failed for agent {agent_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Snapshot export failed"
+        )
+    return FileResponse(
+        file_path,
+        media_type="application/octet-stream",
+        filename=f"{agent_id}.npz",
+        background=BackgroundTask(os.remove, file_path)
+    )
+
+@router.post("/agents/import", response_model=SnapshotImportResponse)
+async def import_snapshot(
+    agent_id: str = Form(...),
+    knowledge_base_path: str = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Create a new agent from a knowledge base snapshot.
+
+    This endpoint bulk-loads a snapshot produced by the export endpoint into a new
+    knowledge base path without calling the embedding provider, and registers an agent
+    that uses it.
+
+    Args:
+        agent_id: The ID of the agent to create.
+        knowledge_base_path: The path of the new knowledge base. It must be empty.
+        file: The snapshot file to import.
+
+    Returns:
+        The created agent along with the number of imported records.
+    """
+    if db.query(DBAgent).filter(DBAgent.id == agent_id).first():
+        raise HTTPException(status_code=409, detail="Agent already exists")
+
+    try:
+        # The import opens the path directly; make sure it is not served by a stale system
+        vector_store_cache.invalidate(knowledge_base_path)
+
+        # The upload is already spooled to a seekable temp file, so read it in place
+        stats = await asyncio.to_thread(
+            SnapshotService().import_snapshot, file.file, knowledge_base_path
+        )
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for metadata in stats.ingests:
+        record_document(
+            db, knowledge_base_path, metadata["document_hash"], metadata, metadata["chunk_count"], commit=False
+        )
+    bump_generation(db, knowledge_base_path)
+    db_agent = DBAgent(id=agent_id, knowledge_base_path=knowledge_base_path)
+    db.add(db_agent)
+    db.commit()
+    db.refresh(db_agent)
+    return SnapshotImportResponse(
+        agent=_to_agent_schema(db_agent),
+        count=stats.count,
+        dimension=stats.dimension
+    )
@@ -1,10 +1,20 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
 from app.models.schemas import QuestionRequest, AnswerResponse, IngestResponse
-from app.dependencies import get_retrieval_service, get_indexing_service, get_db
+from app.dependencies import (
+    get_retrieval_service,
+    get_indexing_service,
+    get_db,
+    get_agent,
+    get_vector_store,
+    get_shared_vector_stores,
+)
+from app.models.database import Agent as DBAgent
+from app.services.metadata_index import resolve_filters
 from app.services.retrieval import RetrievalService
 from app.services.indexing import IndexingService
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List
+from langchain_chroma import Chroma
 import logging
 import os
 from app.config import settings
@@ -18,6 +28,9 @@ async def ask_question(
     chat_id: str,
     request: QuestionRequest,
     retrieval_service: RetrievalService = Depends(get_retrieval_service),
+    agent: DBAgent = Depends(get_agent),
+    vector_store: Chroma = Depends(get_vector_store),
+    shared_stores: Dict[str, Chroma] = Depends(get_shared_vector_stores),
     db: Session = Depends(get_db),
 ):
     """
@@ -25,12 +38,13 @@ async def ask_question(
 
     This endpoint allows you to ask a question to a specific agent within a chat session.
     The chat history is used to provide context for the question, and the response is
-    generated using the RAG pattern.
+    generated using the RAG pattern. Optional filters scope the search to matching
+    documents and are pushed down to the vector store.
 
     Args:
         agent_id: The ID of the agent.
         chat_id: The ID of the chat session.
-        request: The question request containing the question text.
+        request: The question request containing the question text and optional filters.
 
     Returns:
         An AnswerResponse containing the answer and sources.
@@ -43,7 +57,12 @@ async def ask_question(
     
     # Generate a context-aware prompt
     context = "\n".join(chat_history)
-    response = await retrieval_service.get_answer(context)
+    resolved_filter = resolve_filters(
+        db,
+        {agent.knowledge_base_path: vector_store, **shared_stores},
+        request.filters
+    )
+    response = await retrieval_service.get_answer(context, resolved_filter)
     
     # Save the new question and answer to the chat history
     await retrieval_service.save_chat_message(agent_id, chat_id, request.question, db)
@@ -51,7 +70,8 @@ async def ask_question(
     
     return AnswerResponse(
         answer=response.answer,
-        sources=response.sources
+        sources=response.sources,
+        metadata=response.metadata
     )
 
 @router.post("/ingest/url", response_model=IngestResponse)
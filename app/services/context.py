@@ -0,0 +1,155 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import litellm
+from langchain_core.documents import Document
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fallbacks for chunks indexed without a document_hash; these are not unique per document
+FALLBACK_SOURCE_KEYS = ("source", "url", "filename", "title")
+MIN_TEXT_OVERLAP = 20
+
+# Knowledge base, document, ingest time and page; offsets are only comparable within one key
+PassageKey = Tuple[str, str, Optional[float], Optional[int]]
+
+@dataclass
+class Passage:
+    """Data class for a run of merged chunks from one ingest of a document page."""
+    key: PassageKey
+    text: str
+    rank: int
+    start: Optional[int] = None
+    end: Optional[int] = None
+    chunk_count: int = 1
+    metadata: Dict = field(default_factory=dict)
+
+class ContextPacker:
+    """Assembles retrieved chunks into a deduplicated, token-bounded prompt context.
+
+    Chunks from the same document and page are merged when they are adjacent or
+    overlap, so the ``chunk_overlap`` span is sent once. Passages are then
+    ordered by their best retrieval rank and added until the token budget is
+    spent.
+    """
+
+    def __init__(self, token_budget: int = None, token_counter: Callable[[str], int] = None):
+        self.token_budget = token_budget or settings.context_token_budget
+        self.token_counter = token_counter or self._count_tokens
+
+    @staticmethod
+    def _count_tokens(text: str) -> int:
+        """Count tokens with the configured model's tokenizer."""
+        return litellm.token_counter(model=settings.model_name, text=text)
+
+    @staticmethod
+    def _source_key(doc: Document) -> PassageKey:
+        """Identify the knowledge base, document ingest and page a chunk belongs to."""
+        document = doc.metadata.get("document_hash") or next(
+            (str(doc.metadata[key]) for key in FALLBACK_SOURCE_KEYS if doc.metadata.get(key)), ""
+        )
+        # A re-ingested URL keeps its hash but may have different content and offsets
+        return (
+            doc.metadata.get("knowledge_base", ""),
+            document,
+            doc.metadata.get("ingested_at"),
+            doc.metadata.get("page")
+        )
+
+    @staticmethod
+    def _text_overlap(left: str, right: str) -> int:
+        """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+        limit = min(len(left), len(right), settings.chunk_overlap)
+        for size in range(limit, MIN_TEXT_OVERLAP - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    def _merge_by_offset(self, passages: List[Passage]) -> List[Passage]:
+        """Merge chunks whose recorded character offsets touch or overlap."""
+        merged: List[Passage] = []
+        for passage in sorted(passages, key=lambda p: p.start):
+            last = merged[-1] if merged else None
+            if last and passage.start <= last.end:
+                if passage.end > last.end:
+                    last.text += passage.text[last.end - passage.start:]
+                    last.end = passage.end
+                last.rank = min(last.rank, passage.rank)
+                last.chunk_count += passage.chunk_count
+            else:
+                merged.append(passage)
+        return merged
+
+    def _merge_by_text(self, passages: List[Passage]) -> List[Passage]:
+        """Merge chunks without offsets by matching their overlapping text."""
+        merged: List[Passage] = []
+        for passage in passages:
+            for other in merged:
+                if passage.text in other.text:
+                    other.rank = min(other.rank, passage.rank)
+                    other.chunk_count += passage.chunk_count
+                    break
+                appended = self._text_overlap(other.text, passage.text)
+                prepended = self._text_overlap(passage.text, other.text)
+                if appended:
+                    other.text += passage.text[appended:]
+                elif prepended:
+                    other.text = passage.text + other.text[prepended:]
+                else:
+                    continue
+                other.rank = min(other.rank, passage.rank)
+                other.chunk_count += passage.chunk_count
+                break
+            else:
+                merged.append(passage)
+        return merged
+
+    def merge(self, documents: List[Document]) -> List[Passage]:
+        """Group chunks by document and page and merge overlapping ones into passages."""
+        groups: Dict[PassageKey, List[Passage]] = {}
+        for rank, doc in enumerate(documents):
+            key = self._source_key(doc)
+            start = doc.metadata.get("start_index")
+            groups.setdefault(key, []).append(Passage(
+                key=key,
+                text=doc.page_content,
+                rank=rank,
+                start=start,
+                end=start + len(doc.page_content) if start is not None else None,
+                metadata=dict(doc.metadata)
+            ))
+
+        passages: List[Passage] = []
+        for group in groups.values():
+            with_offsets = [p for p in group if p.start is not None]
+            without_offsets = [p for p in group if p.start is None]
+            passages.extend(self._merge_by_offset(with_offsets))
+            passages.extend(self._merge_by_text(without_offsets))
+        return sorted(passages, key=lambda p: p.rank)
+
+    def pack(self, documents: List[Document]) -> str:
+        """Build the prompt context from retrieved documents within the token budget."""
+        passages = self.merge(documents)
+        packed: List[str] = []
+        remaining = self.token_budget
+        for passage in passages:
+            tokens = self.token_counter(passage.text)
+            if tokens <= remaining:
+                packed.append(passage.text)
+                remaining -= tokens
+            elif not packed and remaining > 0:
+                # Keep a truncated head of the best passage rather than sending nothing
+                head = passage.text[:len(passage.text) * remaining // tokens]
+                while head and self.token_counter(head) > remaining:
+                    head = head[:len(head) * 9 // 10]
+                packed.append(head)
+                remaining = 0
+
+        logger.debug(
+            f"Packed {len(packed)} of {len(passages)} passages from {len(documents)} chunks, "
+            f"{self.token_budget - remaining} of {self.token_budget} tokens"
+        )
+        return "\n\n".join(packed)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_chroma import Chroma
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class FederatedSearchResult:
+    """Data class for storing merged results of a multi-store search."""
+    documents: List[Tuple[Document, float]]
+    latencies_ms: Dict[str, float] = field(default_factory=dict)
+
+class FederatedSearcher:
+    """Fans a single query out to several vector stores and merges the hits."""
+
+    def __init__(self, stores: Dict[str, Chroma], embedding_function: Embeddings) -> None:
+        """
+        Initialize the federated searcher.
+
+        Args:
+            stores: Vector stores keyed by a knowledge base label
+            embedding_function: Embedding model shared by all stores
+        """
+        if not stores:
+            raise ValueError("At least one vector store is required")
+        self.stores = stores
+        self.embedding_function = embedding_function
+        self.last_latencies_ms: Dict[str, float] = {}
+
+    @staticmethod
+    def _normalize_score(store: Chroma, distance: float) -> float:
+        """Convert a raw store distance into a relevance score comparable across stores."""
+        score = store._select_relevance_score_fn()(distance)
+        if settings.score_normalization:
+            score = min(max(score, 0.0), 1.0)
+        return score
+
+    def _search_store(
+        self, name: str, embedding: List[float], k: int, filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, List[Tuple[Document, float]], float]:
+        """Search one store with a precomputed query embedding."""
+        store = self.stores[name]
+        started = time.perf_counter()
+        try:
+            results = store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+            hits = []
+            for doc, distance in results:
+                score = self._normalize_score(store, distance)
+                doc.metadata.setdefault("knowledge_base", name)
+                doc.metadata["relevance_score"] = score
+                hits.append((doc, score))
+        except Exception as e:
+            logger.error(f"Federated search failed for store {name}: {str(e)}")
+            hits = []
+        return name, hits, (time.perf_counter() - started) * 1000
+
+    def _merge(self, per_store: List[Tuple[str, List[Tuple[Document, float]], float]], k: int) -> FederatedSearchResult:
+        """Merge per-store hits into a global top-k and record latencies."""
+        latencies = {name: round(latency, 2) for name, _, latency in per_store}
+        hits = [hit for _, store_hits, _ in per_store for hit in store_hits]
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        if settings.similarity_score_threshold is not None:
+            hits = [hit for hit in hits if hit[1] >= settings.similarity_score_threshold]
+
+        self.last_latencies_ms = latencies
+        logger.info(f"Federated search latencies (ms): {latencies}")
+        return FederatedSearchResult(documents=hits[:k], latencies_ms=latencies)
+
+    def search(
+        self, query: str, k: Optional[int] = None, filter: Optional[Dict[str, Any]] = None
+    ) -> FederatedSearchResult:
+        """Search all stores concurrently on a thread pool, embedding the query only once."""
+        k = k or settings.similarity_top_k
+        embedding = self.embedding_function.embed_query(query)
+        with ThreadPoolExecutor(max_workers=len(self.stores)) as executor:
+            per_store = list(executor.map(
+                lambda name: self._search_store(name, embedding, k, filter),
+                self.stores
+            ))
+        return self._merge(per_store, k)
+
+    async def asearch(
+        self, query: str, k: Optional[int] = None, filter: Optional[Dict[str, Any]] = None
+    ) -> FederatedSearchResult:
+        """Search all stores concurrently, embedding the query only once."""
+        k = k or settings.similarity_top_k
+        embedding = await asyncio.to_thread(self.embedding_function.embed_query, query)
+        per_store = await asyncio.gather(*(
+            asyncio.to_thread(self._search_store, name, embedding, k, filter)
+            for name in self.stores
+        ))
+        return self._merge(list(per_store), k)
+
+class FederatedRetriever(BaseRetriever):
+    """Retriever that returns the global top-k across several vector stores."""
+
+    searcher: Any
+    k: int = settings.similarity_top_k
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        result = self.searcher.search(query, k=self.k, filter=filter)
+        return [doc for doc, _ in result.documents]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        result = await self.searcher.asearch(query, k=self.k, filter=filter)
+        return [doc for doc, _ in result.documents]
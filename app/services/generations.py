@@ -0,0 +1,138 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List
+
+from langchain_chroma import Chroma
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.database import KnowledgeBaseGeneration
+
+logger = logging.getLogger(__name__)
+
+def bump_generation(db: Session, knowledge_base_path: str) -> int:
+    """Atomically increment the generation of a knowledge base and return the new value."""
+    statement = insert(KnowledgeBaseGeneration).values(
+        knowledge_base_path=knowledge_base_path,
+        generation=1
+    ).on_conflict_do_update(
+        index_elements=[KnowledgeBaseGeneration.knowledge_base_path],
+        set_={"generation": KnowledgeBaseGeneration.generation + 1}
+    )
+    db.execute(statement)
+    db.commit()
+    return get_generations(db, [knowledge_base_path])[knowledge_base_path]
+
+def get_generations(db: Session, knowledge_base_paths: Iterable[str]) -> Dict[str, int]:
+    """Read the current generation of each knowledge base in a single query."""
+    paths = list(knowledge_base_paths)
+    rows = db.query(
+        KnowledgeBaseGeneration.knowledge_base_path,
+        KnowledgeBaseGeneration.generation
+    ).filter(KnowledgeBaseGeneration.knowledge_base_path.in_(paths)).all()
+    generations = {path: 0 for path in paths}
+    generations.update({path: generation for path, generation in rows})
+    return generations
+
+@dataclass
+class CachedStore:
+    """Data class for a cached vector store handle and its in-flight leases."""
+    generation: int
+    store: Chroma
+    leases: int = 0
+    system: Any = None  # Chroma system detached from the shared cache once retired
+
+class VectorStoreCache:
+    """Worker-local cache of vector store handles keyed by knowledge base path.
+
+    Each handle remembers the generation it was opened at. When the shared
+    generation has moved on, another worker has written to the knowledge base,
+    so the handle is retired and the store reopened to pick up the new data.
+    Chroma's in-process system for the retired handle is detached from its
+    shared cache and stopped once the last request leasing it has finished.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CachedStore] = {}
+        self._retired: List[CachedStore] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, knowledge_base_path: str, generation: int, factory: Callable[[], Chroma]) -> Chroma:
+        """Lease a handle opened at the given generation, reopening stale ones."""
+        with self._lock:
+            entry = self._entries.get(knowledge_base_path)
+            if entry and entry.generation != generation:
+                logger.info(
+                    f"Knowledge base {knowledge_base_path} moved from generation "
+                    f"{entry.generation} to {generation}, reopening"
+                )
+                self._retire(knowledge_base_path)
+                entry = None
+
+            if not entry:
+                entry = CachedStore(generation=generation, store=factory())
+                self._entries[knowledge_base_path] = entry
+            entry.leases += 1
+            return entry.store
+
+    def release(self, store: Chroma) -> None:
+        """Return a leased handle, stopping its system if it was retired meanwhile."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.store is store:
+                    entry.leases -= 1
+                    return
+            for entry in self._retired:
+                if entry.store is store:
+                    entry.leases -= 1
+                    if not entry.leases:
+                        self._retired.remove(entry)
+                        self._stop(entry.system)
+                    return
+
+    def invalidate(self, knowledge_base_path: str) -> None:
+        """Drop any handle or Chroma system for a path before writing to it directly."""
+        with self._lock:
+            if knowledge_base_path in self._entries:
+                self._retire(knowledge_base_path)
+            else:
+                self._stop(self._detach_system(knowledge_base_path))
+
+    def mark_current(self, knowledge_base_path: str, generation: int, store: Chroma) -> None:
+        """Record a write made through ``store``, which therefore already sees it."""
+        with self._lock:
+            entry = self._entries.get(knowledge_base_path)
+            # Another handle, or a gap left by another worker's write, must be reopened
+            if entry and entry.store is store and entry.generation == generation - 1:
+                entry.generation = generation
+
+    def _retire(self, knowledge_base_path: str) -> None:
+        """Remove a handle from the cache, stopping its system now or on last release."""
+        entry = self._entries.pop(knowledge_base_path)
+        entry.system = self._detach_system(knowledge_base_path)
+        if entry.leases:
+            self._retired.append(entry)
+        else:
+            self._stop(entry.system)
+
+    @staticmethod
+    def _detach_system(knowledge_base_path: str) -> Any:
+        """Remove Chroma's cached system for a path so the next client reloads from disk."""
+        try:
+            from chromadb.api.shared_system_client import SharedSystemClient
+        except ImportError:
+            from chromadb.api.client import SharedSystemClient
+        return SharedSystemClient._identifier_to_system.pop(knowledge_base_path, None)
+
+    @staticmethod
+    def _stop(system: Any) -> None:
+        """Stop a detached Chroma system, releasing its index memory and connections."""
+        if system is None:
+            return
+        try:
+            system.stop()
+        except Exception as e:
+            logger.warning(f"Failed to stop Chroma system: {str(e)}")
+
+vector_store_cache = VectorStoreCache()
@@ -1,7 +1,9 @@
+import asyncio
 import hashlib
 import logging
+import time
 from dataclasses import dataclass
-from typing import List, Dict, Any, Union, AsyncIterator
+from typing import List, Dict, Any, Union, AsyncIterator, Callable, Optional
 from pathlib import Path
 
 from langchain_community.document_loaders import WebBaseLoader, PyPDFLoader
@@ -20,6 +22,7 @@ LoaderType = Union[WebBaseLoader, PyPDFLoader, RawTextLoader]
 @dataclass
 class DocumentMetadata:
     document_hash: str
+    ingested_at: float
     additional_metadata: Dict[str, Any]
 
 class DocumentProcessor:
@@ -27,12 +30,12 @@ class DocumentProcessor:
     
     @staticmethod
     async def load_documents(loader: LoaderType) -> List[Document]:
-        """Load documents based on loader type."""
+        """Load documents based on loader type, keeping blocking I/O off the event loop."""
         if isinstance(loader, PyPDFLoader):
             return [doc async for doc in loader.alazy_load()]
         if isinstance(loader, RawTextLoader):
             return loader.load()
-        return loader.load()
+        return await asyncio.to_thread(loader.load)
 
     @staticmethod
     def validate_documents(documents: List[Document]) -> None:
@@ -66,11 +69,12 @@ class LoaderFactory:
 class IndexingService:
     """Service for indexing documents into vector store."""
 
-    def __init__(self, vector_store: Chroma):
+    def __init__(self, vector_store: Chroma, on_indexed: Optional[Callable[[DocumentMetadata, int], None]] = None):
         if not settings.is_valid_chunk_config:
             raise ValueError("Invalid chunk configuration")
             
         self.vector_store = vector_store
+        self.on_indexed = on_indexed
         self.text_splitter = self._create_text_splitter()
         self.document_processor = DocumentProcessor()
         self.loader_factory = LoaderFactory()
@@ -82,25 +86,34 @@ class IndexingService:
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap,
             length_function=len,
-            is_separator_regex=False
+            is_separator_regex=False,
+            add_start_index=True
         )
 
     @staticmethod
-    def _compute_document_hash(source: str) -> str:
-        """Compute SHA-256 hash of the source."""
+    def _compute_document_hash(source: str, source_type: str = "web") -> str:
+        """Compute SHA-256 hash of the source, or of the file contents for uploaded files."""
+        if source_type == "pdf":
+            # Uploads share a temp path per filename, so the path does not identify the document
+            return hashlib.sha256(Path(source).read_bytes()).hexdigest()
         return hashlib.sha256(source.encode()).hexdigest()
 
-    def _prepare_document_metadata(self, source: str, metadata: Dict[str, Any] = None) -> DocumentMetadata:
+    def _prepare_document_metadata(
+        self, source: str, metadata: Dict[str, Any] = None, source_type: str = "web"
+    ) -> DocumentMetadata:
         """Prepare metadata for documents."""
         return DocumentMetadata(
-            document_hash=self._compute_document_hash(source),
+            document_hash=self._compute_document_hash(source, source_type),
+            ingested_at=time.time(),
             additional_metadata=metadata or {}
         )
 
     async def index_content(self, source: str, source_type: str = "web", metadata: Dict[str, Any] = None) -> bool:
         """Index content from various sources into the vector store."""
         try:
-            doc_metadata = self._prepare_document_metadata(source, metadata)
+            doc_metadata = await asyncio.to_thread(
+                self._prepare_document_metadata, source, metadata, source_type
+            )
             loader = self.loader_factory.create_loader(source, source_type)
             
             # Load and process documents
@@ -112,14 +125,18 @@ class IndexingService:
                 documents = [Document(page_content=str(item)) for item in documents]
             
             # Split and update metadata
-            splits = self.text_splitter.split_documents(documents)
+            splits = await asyncio.to_thread(self.text_splitter.split_documents, documents)
             for split in splits:
                 split.metadata.update({
                     "document_hash": doc_metadata.document_hash,
+                    "ingested_at": doc_metadata.ingested_at,
                     **doc_metadata.additional_metadata
                 })
 
-            self.vector_store.add_documents(splits)
+            # Embedding and writing are blocking; keep them off the event loop
+            await asyncio.to_thread(self.vector_store.add_documents, splits)
+            if self.on_indexed:
+                self.on_indexed(doc_metadata, len(splits))
             return True
             
         except Exception as e:
@@ -0,0 +1,140 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from langchain_chroma import Chroma
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.database import KnowledgeBaseIngest
+from app.models.schemas import QuestionFilters
+
+logger = logging.getLogger(__name__)
+
+# Filter fields matched against chunk metadata keys of the same meaning
+LIST_FILTERS = {
+    "source_types": "source_type",
+    "document_hashes": "document_hash",
+    "filenames": "filename",
+    "urls": "url",
+    "titles": "title",
+}
+
+@dataclass
+class ResolvedFilter:
+    """Data class for a filter ready to be pushed down to the vector store."""
+    where: Optional[Dict[str, Any]] = None
+    matches_nothing: bool = False
+
+def record_document(
+    db: Session,
+    knowledge_base_path: str,
+    document_hash: str,
+    metadata: Dict[str, Any],
+    chunk_count: int,
+    commit: bool = True,
+) -> None:
+    """
+    Add an ingest of a document to the knowledge base metadata index.
+
+    Each ingest gets its own entry, because re-ingesting a document adds a new set
+    of chunks carrying that ingest's filename, title and timestamp while the
+    earlier chunks keep theirs. The index is complete while the chunk counts of
+    its entries sum to the collection size.
+    """
+    db.add(KnowledgeBaseIngest(
+        knowledge_base_path=knowledge_base_path,
+        document_hash=document_hash,
+        source_type=metadata.get("source_type"),
+        filename=metadata.get("filename"),
+        url=metadata.get("url"),
+        title=metadata.get("title"),
+        ingested_at=metadata.get("ingested_at"),
+        chunk_count=chunk_count
+    ))
+    if commit:
+        db.commit()
+
+def build_where(filters: Optional[QuestionFilters]) -> Optional[Dict[str, Any]]:
+    """Translate request filters into a Chroma ``where`` clause over chunk metadata."""
+    if not filters:
+        return None
+
+    conditions: List[Dict[str, Any]] = []
+    for field_name, key in LIST_FILTERS.items():
+        values = getattr(filters, field_name)
+        if values:
+            conditions.append({key: {"$in": values}})
+    if filters.ingested_after:
+        conditions.append({"ingested_at": {"$gte": filters.ingested_after.timestamp()}})
+    if filters.ingested_before:
+        conditions.append({"ingested_at": {"$lt": filters.ingested_before.timestamp()}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def resolve_filters(
+    db: Session,
+    stores: Dict[str, Chroma],
+    filters: Optional[QuestionFilters],
+) -> ResolvedFilter:
+    """
+    Resolve request filters against the metadata index.
+
+    When every knowledge base is fully indexed, the filters are matched in SQLite
+    and the matching documents are pushed down to Chroma as a ``document_hash``
+    clause alongside the filters themselves, so the vector search only visits
+    matching documents and is skipped entirely when nothing matches. The filters
+    are kept in the clause because other ingests of a matching document may not
+    match them.
+    A knowledge base counts as fully indexed only when its indexed chunk counts
+    add up to the collection size. Otherwise some chunks, such as those ingested
+    before the index existed, have no entry, and the filters fall back to
+    matching chunk metadata directly.
+
+    Args:
+        db: Database session
+        stores: Vector stores the query will search, keyed by knowledge base path
+        filters: Optional filters from the question request
+
+    Returns:
+        ResolvedFilter to pass to the retrieval service
+    """
+    where = build_where(filters)
+    if where is None:
+        return ResolvedFilter()
+
+    collection_counts = {path: store._collection.count() for path, store in stores.items()}
+    knowledge_base_paths = list(collection_counts)
+    indexed_counts = dict(
+        db.query(
+            KnowledgeBaseIngest.knowledge_base_path,
+            func.sum(KnowledgeBaseIngest.chunk_count)
+        )
+        .filter(KnowledgeBaseIngest.knowledge_base_path.in_(knowledge_base_paths))
+        .group_by(KnowledgeBaseIngest.knowledge_base_path)
+    )
+    if any(indexed_counts.get(path, 0) != count for path, count in collection_counts.items()):
+        return ResolvedFilter(where=where)
+
+    query = db.query(KnowledgeBaseIngest.document_hash).filter(
+        KnowledgeBaseIngest.knowledge_base_path.in_(knowledge_base_paths)
+    )
+    for field_name, key in LIST_FILTERS.items():
+        values = getattr(filters, field_name)
+        if values:
+            query = query.filter(getattr(KnowledgeBaseIngest, key).in_(values))
+    if filters.ingested_after:
+        query = query.filter(KnowledgeBaseIngest.ingested_at >= filters.ingested_after.timestamp())
+    if filters.ingested_before:
+        query = query.filter(KnowledgeBaseIngest.ingested_at < filters.ingested_before.timestamp())
+
+    hashes = sorted({document_hash for (document_hash,) in query})
+    if not hashes:
+        logger.info("No indexed documents match the request filters")
+        return ResolvedFilter(matches_nothing=True)
+    if len(hashes) > settings.filter_max_document_ids:
+        return ResolvedFilter(where=where)
+    return ResolvedFilter(where={"$and": [{"document_hash": {"$in": hashes}}, where]})
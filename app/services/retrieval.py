@@ -1,21 +1,27 @@
 from dataclasses import dataclass
+from operator import itemgetter
 from langchain import hub
 from langchain_chroma import Chroma
 from langchain_core.runnables import (
     RunnablePassthrough,
     RunnableParallel,
+    RunnableLambda,
     Runnable,
 )
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import BaseMessage
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from app.config import settings
 import logging
 import litellm
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from langchain_core.vectorstores import VectorStoreRetriever
 from sqlalchemy.orm import Session
 from app.models.database import Chat as DBChat
+from app.services.context import ContextPacker
+from app.services.federated import FederatedRetriever, FederatedSearcher
+from app.services.metadata_index import ResolvedFilter
 import json
 
 logger = logging.getLogger(__name__)
@@ -30,18 +36,22 @@ class RetrievalResponse:
 class RetrievalService:
     """Service for retrieving and generating answers using RAG pattern."""
 
-    def __init__(self, vector_store: Chroma) -> None:
+    def __init__(self, vector_store: Chroma, shared_stores: Optional[Dict[str, Chroma]] = None) -> None:
         """
         Initialize the retrieval service.
         
         Args:
             vector_store: Initialized Chroma vector store
+            shared_stores: Additional vector stores searched alongside the agent's own,
+                keyed by knowledge base path
         """
         self._validate_vector_store(vector_store)
         self.vector_store = vector_store
+        self.searcher = self._setup_searcher(shared_stores)
         self.device = settings.device
         self.model = settings.model_name
         self.retriever = self._setup_retriever()
+        self.context_packer = ContextPacker()
         self.prompt: ChatPromptTemplate = hub.pull("rlm/rag-prompt")
         self.setup_chain()
 
@@ -51,42 +61,76 @@ class RetrievalService:
         if not vector_store._collection.count():
             logger.warning("Vector store is empty")
 
-    def _setup_retriever(self) -> VectorStoreRetriever:
+    def _setup_searcher(self, shared_stores: Optional[Dict[str, Chroma]]) -> Optional[FederatedSearcher]:
+        """Create a fan-out searcher when the agent draws on shared knowledge bases."""
+        if not shared_stores:
+            return None
+        return FederatedSearcher(
+            stores={"primary": self.vector_store, **shared_stores},
+            embedding_function=self.vector_store.embeddings
+        )
+
+    def _setup_retriever(self) -> Union[VectorStoreRetriever, FederatedRetriever]:
         """
         Configure the retriever with search settings.
         
         Returns:
             Configured retriever instance
         """
+        if self.searcher:
+            return FederatedRetriever(searcher=self.searcher, k=settings.similarity_top_k)
         return self.vector_store.as_retriever(
             search_type="similarity",
             search_kwargs={"k": settings.similarity_top_k}
         )
 
     def setup_chain(self) -> None:
-        """Initialize the RAG processing chain."""
-        self.rag_chain = (
+        """Initialize the RAG processing chain.
+
+        The chain retrieves once and returns the documents alongside the answer,
+        so sources, scores and latencies describe the search that built the prompt.
+        """
+        generate = (
             RunnableParallel({
-                "context": self.retriever,
-                "question": RunnablePassthrough()
+                "context": itemgetter("docs") | RunnableLambda(self._pack_context),
+                "question": itemgetter("question")
             })
             | self.prompt
             | self._extract_content
             | self._generate_answer
             | StrOutputParser()
         )
+        self.rag_chain = (
+            RunnablePassthrough.assign(docs=RunnableLambda(self._retrieve))
+            | RunnablePassthrough.assign(answer=generate)
+        )
+
+    async def _retrieve(self, inputs: Dict[str, Any]) -> List[Document]:
+        """Retrieve documents, pushing any metadata filter down to the vector store."""
+        resolved_filter: Optional[ResolvedFilter] = inputs.get("filter")
+        if resolved_filter and resolved_filter.matches_nothing:
+            return []
+        where = resolved_filter.where if resolved_filter else None
+        return await self.retriever.ainvoke(inputs["question"], filter=where)
+
+    def _pack_context(self, documents: List[Document]) -> Union[str, List[Document]]:
+        """Merge overlapping chunks and fit them into the context token budget."""
+        if not settings.context_packing:
+            return documents
+        return self.context_packer.pack(documents)
 
     @staticmethod
     def _extract_content(x: Any) -> str:
         """Extract content from prompt response."""
         return x.content if hasattr(x, 'content') else str(x)
 
-    async def get_answer(self, context: str) -> RetrievalResponse:
+    async def get_answer(self, context: str, resolved_filter: Optional[ResolvedFilter] = None) -> RetrievalResponse:
         """
         Get answer and sources for the given context.
         
         Args:
             context: Combined chat history and user question
+            resolved_filter: Optional metadata filter scoping the search
             
         Returns:
             RetrievalResponse containing answer, sources and metadata
@@ -98,19 +142,26 @@ class RetrievalService:
             raise ValueError("Empty context provided")
         
         try:
-            answer = await self.rag_chain.ainvoke(context)
-            sources = await self._get_sources(context)
+            result = await self.rag_chain.ainvoke({"question": context, "filter": resolved_filter})
+            answer = result["answer"]
+            sources, source_scores = self._get_sources(result["docs"])
             
             if not sources:
                 logger.warning("No sources found for the answer")
             
+            metadata = {
+                "model": settings.model_name,
+                "source_count": len(sources)
+            }
+            if source_scores:
+                metadata["source_scores"] = source_scores
+            if self.searcher:
+                metadata["store_latencies_ms"] = self.searcher.last_latencies_ms
+            
             return RetrievalResponse(
                 answer=answer or "I couldn't find relevant information to answer your question.",
                 sources=sources,
-                metadata={
-                    "model": settings.model_name,
-                    "source_count": len(sources)
-                }
+                metadata=metadata
             )
         except Exception as e:
             logger.error(f"Retrieval pipeline failed: {str(e)}")
@@ -144,30 +195,34 @@ class RetrievalService:
             top_p=settings.top_p
         )
 
-    async def _get_sources(self, question: str) -> List[str]:
+    @staticmethod
+    def _get_sources(docs: List[Document]) -> Tuple[List[str], Dict[str, float]]:
         """
         Get list of unique sources for the answer.
         
         Args:
-            question: User question string
+            docs: Documents retrieved for the prompt
             
         Returns:
-            List of unique source strings
+            List of unique source strings and the best relevance score per source,
+            when the retriever reports scores
         """
-        try:
-            docs = self.retriever.get_relevant_documents(question)
-            if not docs:
-                logger.warning("No documents retrieved")
-                return []
-                
-            return list({
-                doc.metadata.get("source", "") 
-                for doc in docs 
-                if hasattr(doc, "metadata")
-            })
-        except Exception as e:
-            logger.error(f"Source retrieval error: {str(e)}")
-            return []
+        if not docs:
+            logger.warning("No documents retrieved")
+            return [], {}
+            
+        sources = list({
+            doc.metadata.get("source", "") 
+            for doc in docs 
+            if hasattr(doc, "metadata")
+        })
+        source_scores: Dict[str, float] = {}
+        for doc in docs:
+            score = doc.metadata.get("relevance_score")
+            if score is not None:
+                source = doc.metadata.get("source", "")
+                source_scores[source] = max(score, source_scores.get(source, score))
+        return sources, source_scores
 
     async def save_chat_message(self, agent_id: str, chat_id: str, message: str, db: Session):
         db_chat = db.query(DBChat).filter(DBChat.id == chat_id, DBChat.agent_id == agent_id).first()
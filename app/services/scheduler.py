@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+INGEST = "ingest"
+
+# Request paths mapped to the priority class they are admitted under
+ROUTE_CLASSES = (
+    (re.compile(r"/agents/[^/]+/chats/[^/]+/ask$"), INTERACTIVE),
+    (re.compile(r"/ingest/[^/]+$"), INGEST),
+    (re.compile(r"/agents/import$"), INGEST),
+)
+
+def classify_request(method: str, path: str) -> Optional[str]:
+    """Return the priority class for a request, or None if it is not admission controlled."""
+    if method != "POST":
+        return None
+    for pattern, priority_class in ROUTE_CLASSES:
+        if pattern.search(path):
+            return priority_class
+    return None
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted and should be retried later."""
+
+    def __init__(self, priority_class: str, retry_after: int, reason: str):
+        super().__init__(f"{priority_class} request rejected: {reason}")
+        self.priority_class = priority_class
+        self.retry_after = retry_after
+        self.reason = reason
+
+@dataclass
+class PriorityClass:
+    """Data class for the limits and counters of one traffic class."""
+    name: str
+    priority: int
+    max_concurrency: int
+    max_queue: int
+    queue_timeout: float
+    active: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    total_service: float = 0.0
+    completed: int = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "avg_service_ms": round(self.total_service / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+class AdmissionScheduler:
+    """Admits requests per priority class with concurrency and queue caps.
+
+    Each class runs at most ``max_concurrency`` requests at once and queues at
+    most ``max_queue`` more; anything beyond that, or anything that waits longer
+    than ``queue_timeout``, is rejected. A class is held back while a class with
+    a higher priority (lower number) has queued requests, so bulk ingestion
+    yields to interactive questions.
+    """
+
+    def __init__(self, classes: Dict[str, PriorityClass]):
+        self.classes = classes
+        self._condition = asyncio.Condition()
+
+    def _can_run(self, cls: PriorityClass) -> bool:
+        if cls.active >= cls.max_concurrency:
+            return False
+        return not any(
+            other.waiting for other in self.classes.values()
+            if other.priority < cls.priority
+        )
+
+    @staticmethod
+    def _retry_after(cls: PriorityClass) -> int:
+        """Estimate how long until a queue slot frees up."""
+        if not cls.completed:
+            return settings.admission_retry_after
+        avg_service = cls.total_service / cls.completed
+        return max(1, math.ceil(avg_service * (cls.waiting + 1) / cls.max_concurrency))
+
+    def _reject(self, cls: PriorityClass, reason: str) -> AdmissionRejected:
+        cls.rejected += 1
+        logger.warning(f"Shedding {cls.name} request: {reason}")
+        return AdmissionRejected(cls.name, self._retry_after(cls), reason)
+
+    async def _wait_for_slot(self, cls: PriorityClass) -> None:
+        """Queue until the class can run, counting against its queue cap."""
+        if cls.waiting >= cls.max_queue:
+            raise self._reject(cls, "queue is full")
+
+        cls.waiting += 1
+        try:
+            async with self._condition:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self._can_run(cls)),
+                    timeout=cls.queue_timeout
+                )
+                cls.active += 1
+        except asyncio.TimeoutError:
+            raise self._reject(cls, "queue wait timed out")
+        finally:
+            cls.waiting -= 1
+            # Lower-priority classes may have been held back by this waiter
+            async with self._condition:
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def admit(self, name: str) -> AsyncIterator[None]:
+        """Hold a slot in the given priority class for the duration of the block."""
+        cls = self.classes[name]
+        started = time.monotonic()
+        if not cls.waiting and self._can_run(cls):
+            # Fast path: a free slot and nobody ahead, so skip the queue entirely
+            cls.active += 1
+        else:
+            await self._wait_for_slot(cls)
+
+        waited = time.monotonic() - started
+        cls.admitted += 1
+        cls.total_wait += waited
+        cls.max_wait = max(cls.max_wait, waited)
+
+        service_started = time.monotonic()
+        try:
+            yield
+        finally:
+            cls.total_service += time.monotonic() - service_started
+            cls.completed += 1
+            async with self._condition:
+                cls.active -= 1
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Report queue depth, concurrency and wait times per priority class."""
+        return {name: cls.stats() for name, cls in self.classes.items()}
+
+scheduler = AdmissionScheduler({
+    INTERACTIVE: PriorityClass(
+        name=INTERACTIVE,
+        priority=0,
+        max_concurrency=settings.interactive_max_concurrency,
+        max_queue=settings.interactive_max_queue,
+        queue_timeout=settings.interactive_queue_timeout,
+    ),
+    INGEST: PriorityClass(
+        name=INGEST,
+        priority=1,
+        max_concurrency=settings.ingest_max_concurrency,
+        max_queue=settings.ingest_max_queue,
+        queue_timeout=settings.ingest_queue_timeout,
+    ),
+})
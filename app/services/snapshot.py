@@ -0,0 +1,196 @@
+import json
+import logging
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Tuple, Union
+
+import chromadb
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 2
+STRING_COLUMNS = ("ids", "documents", "metadatas")
+
+def _encode_strings(values: List[str]) -> Dict[str, np.ndarray]:
+    """Pack strings as concatenated UTF-8 bytes plus an offsets array."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return {
+        "data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "offsets": offsets,
+    }
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray, start: int, end: int) -> List[str]:
+    """Decode rows ``start:end`` of a packed string column."""
+    raw = data[offsets[start]:offsets[end]].tobytes()
+    base = offsets[start]
+    return [
+        raw[offsets[i] - base:offsets[i + 1] - base].decode("utf-8")
+        for i in range(start, end)
+    ]
+
+@dataclass
+class SnapshotStats:
+    """Data class for storing snapshot export/import results."""
+    count: int
+    dimension: int
+    ingests: List[Dict[str, Any]] = field(default_factory=list)
+
+class SnapshotService:
+    """Service for exporting and importing knowledge base snapshots.
+
+    A snapshot is a compressed ``.npz`` archive with one column per field.
+    ``ids``, ``documents`` and ``metadatas`` (JSON encoded) are stored as
+    concatenated UTF-8 bytes with an offsets array, next to a float32
+    ``embeddings`` matrix, the collection metadata and the embedding model
+    name. Importing writes the stored embeddings directly, so the embedding
+    provider is never called, and rejects snapshots made with another model.
+
+    Export holds the encoded columns in memory before writing the archive, and
+    import loads them back whole; peak memory is roughly the size of the
+    uncompressed snapshot.
+    """
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or settings.snapshot_batch_size
+
+    @staticmethod
+    def _get_collection(knowledge_base_path: str):
+        """Open or create the raw Chroma collection at the given knowledge base path."""
+        client = chromadb.PersistentClient(path=knowledge_base_path)
+        return client, client.get_or_create_collection(
+            name=settings.chroma_collection_name,
+            embedding_function=None
+        )
+
+    def export_snapshot(self, collection: Any, file_path: str) -> SnapshotStats:
+        """Export every record of a collection into a snapshot file."""
+        total = collection.count()
+
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[str] = []
+        embeddings: List[np.ndarray] = []
+        for offset in range(0, total, self.batch_size):
+            batch = collection.get(
+                offset=offset,
+                limit=self.batch_size,
+                include=["documents", "metadatas", "embeddings"]
+            )
+            ids.extend(batch["ids"])
+            documents.extend(doc or "" for doc in batch["documents"])
+            metadatas.extend(json.dumps(meta or {}) for meta in batch["metadatas"])
+            embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+
+        matrix = np.concatenate(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+        columns: Dict[str, np.ndarray] = {}
+        for name, values in zip(STRING_COLUMNS, (ids, documents, metadatas)):
+            packed = _encode_strings(values)
+            columns[f"{name}_data"] = packed["data"]
+            columns[f"{name}_offsets"] = packed["offsets"]
+
+        np.savez_compressed(
+            file_path,
+            version=np.array(SNAPSHOT_FORMAT_VERSION),
+            embedding_model=np.array(settings.embedding_model),
+            collection_metadata=np.array(json.dumps(collection.metadata or {})),
+            embeddings=matrix,
+            **columns
+        )
+        logger.info(f"Exported {len(ids)} records from collection {collection.name}")
+        return SnapshotStats(count=len(ids), dimension=int(matrix.shape[1]) if matrix.ndim == 2 else 0)
+
+    @staticmethod
+    def _load_snapshot(source: Union[str, BinaryIO]) -> Dict[str, Any]:
+        """Load and validate a snapshot archive from a path or seekable file."""
+        try:
+            data = np.load(source, allow_pickle=False)
+        except (zipfile.BadZipFile, OSError, EOFError, ValueError) as e:
+            raise ValueError(f"Invalid snapshot archive: {str(e)}")
+        if not isinstance(data, np.lib.npyio.NpzFile):
+            raise ValueError("Invalid snapshot archive: expected an .npz file")
+
+        with data:
+            if "version" not in data.files:
+                raise ValueError("Invalid snapshot, missing fields: ['version']")
+            if int(data["version"]) != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot version: {int(data['version'])}")
+
+            required = {"embedding_model", "embeddings"} | {
+                f"{name}_{part}" for name in STRING_COLUMNS for part in ("data", "offsets")
+            }
+            missing = required - set(data.files)
+            if missing:
+                raise ValueError(f"Invalid snapshot, missing fields: {sorted(missing)}")
+
+            snapshot = {name: data[name] for name in data.files}
+
+        embedding_model = str(snapshot["embedding_model"])
+        if embedding_model != settings.embedding_model:
+            raise ValueError(
+                f"Snapshot was embedded with {embedding_model}, "
+                f"but this deployment uses {settings.embedding_model}"
+            )
+
+        count = len(snapshot["ids_offsets"]) - 1
+        if any(len(snapshot[f"{name}_offsets"]) - 1 != count for name in STRING_COLUMNS):
+            raise ValueError("Invalid snapshot, column lengths differ")
+        if count and snapshot["embeddings"].shape[0] != count:
+            raise ValueError("Invalid snapshot, embedding count does not match ids")
+        snapshot["count"] = count
+        return snapshot
+
+    def import_snapshot(self, source: Union[str, BinaryIO], knowledge_base_path: str) -> SnapshotStats:
+        """Bulk-load a snapshot file into an empty collection at the given path."""
+        snapshot = self._load_snapshot(source)
+        collection_metadata = json.loads(str(snapshot.get("collection_metadata", "{}"))) or None
+
+        client, collection = self._get_collection(knowledge_base_path)
+        if collection.count():
+            raise FileExistsError(f"Knowledge base at {knowledge_base_path} is not empty")
+        if collection_metadata:
+            client.delete_collection(settings.chroma_collection_name)
+            collection = client.create_collection(
+                name=settings.chroma_collection_name,
+                metadata=collection_metadata,
+                embedding_function=None
+            )
+
+        def column(name: str, start: int, end: int) -> List[str]:
+            return _decode_strings(snapshot[f"{name}_data"], snapshot[f"{name}_offsets"], start, end)
+
+        count = snapshot["count"]
+        embeddings = snapshot["embeddings"]
+        batch_size = min(self.batch_size, client.get_max_batch_size())
+        # Summarize metadata per document ingest so the caller can rebuild the metadata index
+        ingests: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        try:
+            for start in range(0, count, batch_size):
+                end = min(start + batch_size, count)
+                metadatas = [json.loads(meta) or None for meta in column("metadatas", start, end)]
+                collection.add(
+                    ids=column("ids", start, end),
+                    documents=column("documents", start, end),
+                    metadatas=metadatas,
+                    embeddings=embeddings[start:end]
+                )
+                for meta in metadatas:
+                    if meta and meta.get("document_hash"):
+                        key = (meta["document_hash"], meta.get("ingested_at"))
+                        entry = ingests.setdefault(key, {**meta, "chunk_count": 0})
+                        entry["chunk_count"] += 1
+        except Exception:
+            # Leave the path empty so the import can be retried
+            client.delete_collection(settings.chroma_collection_name)
+            raise
+
+        logger.info(f"Imported {count} records into {knowledge_base_path}")
+        return SnapshotStats(
+            count=count,
+            dimension=int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+            ingests=list(ingests.values())
+        )